@@ -1,19 +1,116 @@
 import os
+import re
+import shutil
+import threading
+import asyncio
+import aiohttp
 import requests
-import json
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+import orjson
 from datetime import datetime
 from selenium import webdriver
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 from selenium.common.exceptions import TimeoutException
+from selectolax.lexbor import LexborHTMLParser
+from pybloom_live import ScalableBloomFilter
+from yarl import URL
 import urllib.parse
-from collections import deque
-from concurrent.futures import ThreadPoolExecutor, as_completed
+from http.cookies import SimpleCookie, CookieError
+from queue import Queue, Empty
+from concurrent.futures import ThreadPoolExecutor
 import time
 from functools import lru_cache
 
 # ---------- Setup ----------
+def create_driver(lean=False):
+    options = webdriver.ChromeOptions()
+    options.add_argument('--headless')
+    options.add_argument('--no-sandbox')
+    options.add_argument('--disable-dev-shm-usage')
+    if lean:
+        # Crawling only needs the DOM: skip subresources and return once it is parsed.
+        # The login page relies on CSS visibility checks, so it keeps the full profile.
+        options.page_load_strategy = 'eager'
+        options.add_experimental_option('prefs', {
+            'profile.managed_default_content_settings.images': 2,
+            'profile.managed_default_content_settings.stylesheets': 2,
+            'profile.managed_default_content_settings.fonts': 2,
+        })
+        options.add_argument('--blink-settings=imagesEnabled=false')
+        options.add_argument('--disable-extensions')
+        options.add_argument('--disable-background-networking')
+    driver = webdriver.Chrome(options=options)
+    if lean:
+        driver.set_page_load_timeout(15)
+    return driver
+
+def clone_logged_in_driver(browser_cookies, start_url):
+    # The OTP login is interactive, so extra browsers borrow its cookies instead
+    clone = None
+    try:
+        clone = create_driver(lean=True)
+        clone.get(start_url)
+        for cookie in browser_cookies:
+            try:
+                clone.add_cookie(cookie)
+            except Exception as e:
+                print(f"Could not copy cookie {cookie.get('name')}: {e}")
+        return clone
+    except Exception as e:
+        print(f"Could not start a logged-in browser: {e}")
+        if clone is not None:
+            clone.quit()
+        return None
+
+class DriverPool:
+    # Browsers for JavaScript-only pages, started on first use up to `size`
+    def __init__(self, browser_cookies, start_url, size):
+        self.browser_cookies = browser_cookies
+        self.start_url = start_url
+        self.size = size
+        self.drivers = []
+        self.idle = Queue()
+        self.lock = threading.Lock()
+        self.reserved = 0
+        self.can_grow = True
+
+    def lease(self):
+        try:
+            return self.idle.get_nowait()
+        except Empty:
+            pass
+        with self.lock:
+            grow = self.can_grow and self.reserved < self.size
+            if grow:
+                self.reserved += 1
+        if grow:
+            driver = clone_logged_in_driver(self.browser_cookies, self.start_url)
+            with self.lock:
+                if driver is not None:
+                    self.drivers.append(driver)
+                    return driver
+                # Carry on with the browsers we already have
+                self.reserved -= 1
+                self.can_grow = False
+        with self.lock:
+            if not self.drivers:
+                return None
+        return self.idle.get()
+
+    def release(self, driver):
+        self.idle.put(driver)
+
+    def close(self):
+        for driver in self.drivers:
+            try:
+                driver.quit()
+            except Exception as e:
+                print(f"Error closing browser: {e}")
+        self.drivers = []
+
 def create_documents_dir():
     if not os.path.exists("documents"):
         os.makedirs("documents")
@@ -22,74 +119,125 @@ def create_documents_dir():
         print("'documents' directory already exists")
 
 METADATA_PATH = "documents/documents_metadata.json"
+DOWNLOAD_CONCURRENCY = 32
+CRAWL_WORKERS = 16
+BROWSER_POOL_SIZE = 4
+METADATA_FLUSH_EVERY = 50
+WRITE_BATCH_SIZE = 1 << 20
+
+# Shared so synchronous downloads reuse pooled keep-alive connections
+_SESSION = requests.Session()
+_ADAPTER = HTTPAdapter(pool_connections=20, pool_maxsize=50, max_retries=Retry(total=3, backoff_factor=0.3))
+_SESSION.mount('https://', _ADAPTER)
+_SESSION.mount('http://', _ADAPTER)
 
 def load_metadata():
     if os.path.exists(METADATA_PATH):
-        with open(METADATA_PATH, 'r') as f:
-            return json.load(f)
+        with open(METADATA_PATH, 'rb') as f:
+            return orjson.loads(f.read())
     return {}
 
 def save_metadata(metadata):
-    with open(METADATA_PATH, 'w') as f:
-        json.dump(metadata, f, indent=2)
+    with open(METADATA_PATH, 'wb') as f:
+        f.write(orjson.dumps(metadata, option=orjson.OPT_INDENT_2))
+
+def record_download(metadata, url, save_path):
+    now = datetime.now().isoformat()
+    file_key = os.path.basename(save_path)
+    if file_key not in metadata:
+        metadata[file_key] = {
+            "url": url,
+            "update_history": [now]
+        }
+    else:
+        metadata[file_key]["update_history"].append(now)
 
-def save_file_with_metadata(url, save_path):
+def save_file_with_metadata(url, save_path, metadata):
     try:
-        response = requests.get(url, stream=True, timeout=30)
-        response.raise_for_status()
-        with open(save_path, 'wb') as file:
-            for chunk in response.iter_content(chunk_size=8192):
-                if chunk:
-                    file.write(chunk)
+        with _SESSION.get(url, stream=True, timeout=30) as response:
+            response.raise_for_status()
+            response.raw.decode_content = True
+            with open(save_path, 'wb') as file:
+                shutil.copyfileobj(response.raw, file, length=WRITE_BATCH_SIZE)
         print(f"Downloaded: {save_path} from {url}")
+        record_download(metadata, url, save_path)
+        return True
+    except Exception as e:
+        print(f"Failed to download {url}: {e}")
+        return False
 
-        metadata = load_metadata()
-        now = datetime.now().isoformat()
-        file_key = os.path.basename(save_path)
-        if file_key not in metadata:
-            metadata[file_key] = {
-                "url": url,
-                "update_history": [now]
-            }
-        else:
-            metadata[file_key]["update_history"].append(now)
-        save_metadata(metadata)
+async def _fetch(session, url, save_path, metadata):
+    opened = False
+    try:
+        loop = asyncio.get_running_loop()
+        # Bound each connect and read, not the whole transfer, so large files can finish
+        timeout = aiohttp.ClientTimeout(total=None, sock_connect=30, sock_read=30)
+        async with session.get(url, timeout=timeout) as response:
+            response.raise_for_status()
+            opened = True
+            with open(save_path, 'wb') as file:
+                # Coalesce socket reads so each executor hop issues one large write
+                pending = bytearray()
+                async for chunk in response.content.iter_any():
+                    pending += chunk
+                    if len(pending) >= WRITE_BATCH_SIZE:
+                        await loop.run_in_executor(None, file.write, pending)
+                        pending.clear()
+                if pending:
+                    await loop.run_in_executor(None, file.write, pending)
+        print(f"Downloaded: {save_path} from {url}")
+        record_download(metadata, url, save_path)
         return True
     except Exception as e:
         print(f"Failed to download {url}: {e}")
+        if opened and os.path.exists(save_path):
+            # Don't leave a truncated file behind
+            os.remove(save_path)
         return False
 
 # ---------- Utilities ----------
-@lru_cache(maxsize=1000)
-def is_valid_file_extension(url, extensions_tuple):
-    return any(url.lower().endswith(ext) for ext in extensions_tuple)
+FILE_EXTENSIONS = ('.pdf', '.docx', '.doc', '.txt', '.xlsx', '.xls', '.csv', '.ppt', '.pptx')
+EXCLUDED_EXTENSIONS = (
+    '.png', '.gif', '.jpg', '.jpeg', '.bmp', '.webp', '.svg', '.ico', '.tiff',
+    '.zip', '.tar', '.gz', '.rar', '.7z', '.exe', '.dmg', '.pkg', '.deb', '.rpm',
+    '.py', '.java', '.js', '.c', '.cpp', '.h', '.cs', '.php', '.rb', '.go', '.rs',
+    '.md', '.db', '.sqlite', '.so', '.dll'
+)
+SKIPPED_HREF_PREFIXES = ('mailto:', 'javascript:', 'tel:', '#')
 
-def is_same_domain(base_url, url):
-    base_domain = urllib.parse.urlparse(base_url).netloc
-    url_domain = urllib.parse.urlparse(url).netloc
+def _extension_pattern(extensions):
+    # Extension at the end of the path; anything after it must be a query or fragment
+    return r'^[^?#]*\.(?:' + '|'.join(re.escape(ext[1:]) for ext in extensions) + r')(?:$|[?#])'
+
+_FILE_RE = re.compile(_extension_pattern(FILE_EXTENSIONS), re.IGNORECASE)
+_EXCLUDED_RE = re.compile(_extension_pattern(EXCLUDED_EXTENSIONS), re.IGNORECASE)
+
+def classify_url(url):
+    if _FILE_RE.search(url):
+        return 'file'
+    if _EXCLUDED_RE.search(url):
+        return 'exclude'
+    return 'page'
+
+@lru_cache(maxsize=65536)
+def parsed_url(url):
+    # yarl caches derived parts (host, path, ...) on the URL object itself
+    return URL(url)
+
+@lru_cache(maxsize=4096)
+def is_same_domain(base_domain, url_domain):
     return (base_domain == url_domain or 
             url_domain.endswith('.' + base_domain) or 
             base_domain.endswith('.' + url_domain))
 
-@lru_cache(maxsize=1000)
+@lru_cache(maxsize=65536)
 def clean_url(url):
-    parsed = urllib.parse.urlparse(url)
-    cleaned = parsed._replace(fragment='')
-    path = cleaned.path
+    parsed = parsed_url(url)
+    path = parsed.raw_path
     if path.endswith('/') and len(path) > 1:
-        path = path[:-1]
-        cleaned = cleaned._replace(path=path)
-    return urllib.parse.urlunparse(cleaned)
-
-@lru_cache(maxsize=1000)
-def is_excluded_file(url):
-    excluded_extensions = (
-        '.png', '.gif', '.jpg', '.jpeg', '.bmp', '.webp', '.svg', '.ico', '.tiff',
-        '.zip', '.tar', '.gz', '.rar', '.7z', '.exe', '.dmg', '.pkg', '.deb', '.rpm',
-        '.py', '.java', '.js', '.c', '.cpp', '.h', '.cs', '.php', '.rb', '.go', '.rs',
-        '.md', '.db', '.sqlite', '.so', '.dll'
-    )
-    return any(url.lower().endswith(ext) for ext in excluded_extensions)
+        return str(URL.build(scheme=parsed.scheme, authority=parsed.raw_authority, path=path[:-1],
+                             query_string=parsed.raw_query_string, encoded=True))
+    return str(parsed.with_fragment(None))
 
 def get_extension_from_url(url):
     common_extensions = ['.pdf', '.docx', '.xlsx', '.csv', '.txt', '.pptx']
@@ -99,96 +247,265 @@ def get_extension_from_url(url):
     return ".html"
 
 # ---------- Scraping ----------
-def scrape_page_for_links_and_files(url, base_url, extensions, old_visited_pages, old_file_links, driver):
-    print(f"Scraping page: {url}")
+def extract_links(url, hrefs, base_url, old_visited_pages, old_file_links):
     page_links, file_links = set(), set()
+    base = parsed_url(base_url)
+    base_host, base_port = base.host, base.explicit_port
+    base_prefix = base_url + '/'
+    for href in hrefs:
+        # Cheapest rejections first, before any URL parsing
+        if not href or href.startswith(SKIPPED_HREF_PREFIXES):
+            continue
+        try:
+            # urljoin returns absolute hrefs unchanged
+            absolute_url = urllib.parse.urljoin(url, href)
+            if not absolute_url.startswith(base_prefix):
+                parsed = parsed_url(absolute_url)
+                # Like the old netloc comparison, another port is another site
+                if parsed.explicit_port != base_port:
+                    continue
+                url_host = parsed.host or ''
+                if url_host != base_host and not is_same_domain(base_host, url_host):
+                    continue
+            cleaned_url = clean_url(absolute_url)
+        except ValueError:
+            # Malformed href (bad host or port); skip it, not the whole page
+            continue
+        kind = classify_url(cleaned_url)
+        if kind == 'exclude':
+            continue
+        if cleaned_url in old_visited_pages or cleaned_url in old_file_links:
+            continue
+        if kind == 'file':
+            file_links.add(cleaned_url)
+            print(f"Added file: {cleaned_url}")
+        elif cleaned_url == base_url or cleaned_url.startswith(base_prefix):
+            page_links.add(cleaned_url)
+            print(f"Added page: {cleaned_url}")
+    return file_links, page_links
+
+# Browser-side counterpart of extract_links; the extension regexes are shared
+CLASSIFY_LINKS_JS = """
+    const base = arguments[0];
+    const host = new URL(base).hostname;
+    const port = new URL(base).port;
+    const fileRe = new RegExp(arguments[1], 'i');
+    const excludedRe = new RegExp(arguments[2], 'i');
+    return Array.from(document.querySelectorAll('a'), a => {
+        const h = a.href;
+        if (typeof h !== 'string' || !/^https?:$/.test(a.protocol)) return null;
+        if (a.port !== port) return null;
+        if (a.hostname !== host && !a.hostname.endsWith('.' + host) && !host.endsWith('.' + a.hostname)) return null;
+        if (fileRe.test(h)) return [h, 'file'];
+        if (excludedRe.test(h) || (h !== base && !h.startsWith(base + '/'))) return null;
+        return [h, 'page'];
+    }).filter(Boolean);
+"""
+
+def scrape_page_for_links_and_files(url, base_url, old_visited_pages, old_file_links, driver):
+    print(f"Scraping page: {url}")
     try:
-        driver.set_page_load_timeout(30)
-        driver.get(url)
+        try:
+            driver.get(url)
+        except TimeoutException:
+            # Harvest whatever DOM has loaded so far
+            print(f"Timeout while loading {url}, using partial page")
         WebDriverWait(driver, 10).until(EC.presence_of_element_located((By.TAG_NAME, "body")))
-        links = driver.find_elements(By.TAG_NAME, "a")
-        for link in links:
+        # One WebDriver round trip; filtering and classification run in the browser
+        classified = driver.execute_script(
+            CLASSIFY_LINKS_JS, base_url, _FILE_RE.pattern, _EXCLUDED_RE.pattern
+        )
+        page_links, file_links = set(), set()
+        for href, kind in classified:
             try:
-                href = link.get_attribute("href")
-                if not href:
-                    continue
-                absolute_url = urllib.parse.urljoin(url, href)
-                cleaned_url = clean_url(absolute_url)
-                if is_excluded_file(cleaned_url) and not is_valid_file_extension(cleaned_url, extensions):
-                    continue
-                if cleaned_url in old_visited_pages or cleaned_url in old_file_links:
-                    continue
-                if not is_same_domain(base_url, cleaned_url):
-                    continue
-                if is_valid_file_extension(cleaned_url, extensions):
-                    file_links.add(cleaned_url)
-                    print(f"Added file: {cleaned_url}")
-                elif cleaned_url.startswith(base_url):
-                    page_links.add(cleaned_url)
-                    print(f"Added page: {cleaned_url}")
-            except Exception as e:
-                print(f"Error processing link: {e}")
+                cleaned_url = clean_url(href)
+            except ValueError:
+                continue
+            if cleaned_url in old_visited_pages or cleaned_url in old_file_links:
+                continue
+            if kind == 'file':
+                file_links.add(cleaned_url)
+                print(f"Added file: {cleaned_url}")
+            else:
+                page_links.add(cleaned_url)
+                print(f"Added page: {cleaned_url}")
+        return file_links, page_links
     except TimeoutException:
         print(f"Timeout while loading {url}")
     except Exception as e:
         print(f"Error scraping {url}: {e}")
-    return file_links, page_links
+    return set(), set()
+
+def scrape_page_with_pooled_driver(url, base_url, old_visited_pages, old_file_links, driver_pool):
+    driver = driver_pool.lease()
+    if driver is None:
+        print(f"No browser available to render {url}")
+        return set(), set()
+    try:
+        return scrape_page_for_links_and_files(url, base_url, old_visited_pages, old_file_links, driver)
+    finally:
+        driver_pool.release(driver)
+
+def build_cookie_jar(browser_cookies, start_url):
+    # Keep each cookie's domain, path and secure flag so the session never leaks to other hosts
+    cookie_jar = aiohttp.CookieJar()
+    for browser_cookie in browser_cookies:
+        cookie = SimpleCookie()
+        try:
+            cookie[browser_cookie['name']] = browser_cookie['value']
+        except CookieError as e:
+            print(f"Could not copy cookie {browser_cookie.get('name')}: {e}")
+            continue
+        morsel = cookie[browser_cookie['name']]
+        morsel['domain'] = browser_cookie.get('domain', '')
+        morsel['path'] = browser_cookie.get('path', '/')
+        if browser_cookie.get('secure'):
+            morsel['secure'] = True
+        cookie_jar.update_cookies(cookie, response_url=URL(start_url))
+    return cookie_jar
 
-def bfs_crawl(start_url, extensions, max_pages, max_files, driver):
-    base_url = urllib.parse.urlparse(start_url).scheme + "://" + urllib.parse.urlparse(start_url).netloc
-    visited_pages = set()
+async def fetch_page_for_links_and_files(url, base_url, old_visited_pages, old_file_links, session):
+    print(f"Fetching page: {url}")
+    try:
+        async with session.get(url, timeout=aiohttp.ClientTimeout(total=30)) as response:
+            response.raise_for_status()
+            if 'html' not in response.headers.get('Content-Type', ''):
+                return set(), set()
+            body = await response.text(errors='replace')
+            # Relative links resolve against the final URL after any redirects
+            page_url = str(response.url)
+        tree = LexborHTMLParser(body)
+        anchors = tree.css('a')
+        if not anchors:
+            # No static anchors: links are likely built by JavaScript
+            return None
+        base_tag = tree.css_first('base[href]')
+        if base_tag is not None:
+            page_url = urllib.parse.urljoin(page_url, base_tag.attributes.get('href') or '')
+        hrefs = [node.attributes.get('href') for node in anchors]
+        return extract_links(page_url, hrefs, base_url, old_visited_pages, old_file_links)
+    except Exception as e:
+        print(f"Error fetching {url}: {e}")
+    return set(), set()
+
+async def bfs_crawl(start_url, max_pages, max_files, driver_pool, browser_cookies, user_agent, render_js=False):
+    base_url = str(parsed_url(start_url).origin())
+    if max_pages == float('inf'):
+        # Unbounded crawls keep ~10 bits per URL; a rare false positive skips a page
+        visited_pages = ScalableBloomFilter(initial_capacity=100000, error_rate=0.001)
+    else:
+        visited_pages = set()
     file_links = set()
     pages_scraped = 0
-    queue = deque([(start_url, 0)])
+    queue = asyncio.Queue()
+    await queue.put(start_url)
     visited_pages.add(clean_url(start_url))
     print(f"Starting BFS crawl from {start_url}")
     start_time = time.time()
-    while queue and pages_scraped < max_pages and len(file_links) < max_files:
-        current_url, _ = queue.popleft()
-        if is_excluded_file(current_url):
-            continue
-        new_file_links, new_page_links = scrape_page_for_links_and_files(
-            current_url, base_url, tuple(extensions), visited_pages, file_links, driver
-        )
-        file_links.update(new_file_links)
-        if len(file_links) >= max_files:
-            break
-        for page_link in new_page_links:
-            cleaned_link = clean_url(page_link)
-            if cleaned_link not in visited_pages and not is_excluded_file(cleaned_link):
-                queue.append((cleaned_link, 0))
-                visited_pages.add(cleaned_link)
-        pages_scraped += 1
+    loop = asyncio.get_running_loop()
+    # One thread per pooled browser, each render leases a driver for its duration
+    browser_executor = ThreadPoolExecutor(max_workers=driver_pool.size)
+
+    async def worker(session):
+        nonlocal pages_scraped
+        while True:
+            current_url = await queue.get()
+            try:
+                if pages_scraped >= max_pages or len(file_links) >= max_files:
+                    continue
+                # Claim the page slot before awaiting so max_pages holds across workers
+                pages_scraped += 1
+                result = None
+                if not render_js:
+                    result = await fetch_page_for_links_and_files(
+                        current_url, base_url, visited_pages, file_links, session
+                    )
+                if result is None:
+                    # Page needs JavaScript: render it in the logged-in browser
+                    result = await loop.run_in_executor(
+                        browser_executor, scrape_page_with_pooled_driver,
+                        current_url, base_url, visited_pages, file_links, driver_pool
+                    )
+                new_file_links, new_page_links = result
+                file_links.update(new_file_links)
+                if len(file_links) >= max_files:
+                    continue
+                # Links arrive cleaned and filtered from extract_links; only dedup here
+                for page_link in new_page_links:
+                    if page_link not in visited_pages:
+                        visited_pages.add(page_link)
+                        queue.put_nowait(page_link)
+            except Exception as e:
+                print(f"Error crawling {current_url}: {e}")
+            finally:
+                queue.task_done()
+
+    cookie_jar = build_cookie_jar(browser_cookies, start_url)
+    async with aiohttp.ClientSession(cookie_jar=cookie_jar, headers={'User-Agent': user_agent}) as session:
+        workers = [asyncio.create_task(worker(session)) for _ in range(CRAWL_WORKERS)]
+        await queue.join()
+        for task in workers:
+            task.cancel()
+        await asyncio.gather(*workers, return_exceptions=True)
+    browser_executor.shutdown()
     print(f"Scraped {pages_scraped} pages, found {len(file_links)} unique files")
     print(f"Elapsed time: {time.time() - start_time:.2f} seconds")
+    print(f"clean_url cache: {clean_url.cache_info()}")
     return file_links, pages_scraped
 
-def download_files(file_links, max_files):
+def unique_filename(filename, used_filenames):
+    stem, ext = os.path.splitext(filename)
+    candidate = filename
+    n = 2
+    while candidate in used_filenames:
+        candidate = f"{stem}_{n}{ext}"
+        n += 1
+    used_filenames.add(candidate)
+    return candidate
+
+async def download_files_async(file_links, max_files):
     if not file_links:
         print("No files to download")
         return
     create_documents_dir()
-    successful_downloads = 0
-    count = 0
     start_time = time.time()
-    with ThreadPoolExecutor(max_workers=10) as executor:
-        future_to_url = {}
-        for url in file_links:
-            if count >= max_files:
+    # Loaded once and mutated in memory; only the event loop thread touches it
+    metadata = load_metadata()
+    completed = 0
+    semaphore = asyncio.Semaphore(DOWNLOAD_CONCURRENCY)
+    connector = aiohttp.TCPConnector(limit=50, limit_per_host=10, keepalive_timeout=30)
+    async with aiohttp.ClientSession(connector=connector) as session:
+        async def bounded_fetch(url, save_path):
+            nonlocal completed
+            async with semaphore:
+                success = await _fetch(session, url, save_path, metadata)
+            if success:
+                completed += 1
+                if completed % METADATA_FLUSH_EVERY == 0:
+                    save_metadata(metadata)
+            return success
+
+        tasks = []
+        used_filenames = set()
+        # Sorted so repeated basenames get the same suffix on every run
+        for url in sorted(file_links):
+            if len(tasks) >= max_files:
                 break
             filename = os.path.basename(urllib.parse.urlparse(url).path)
             if not filename or '.' not in filename:
-                filename = f"document_{successful_downloads + 1}{get_extension_from_url(url)}"
+                filename = f"document_{len(tasks) + 1}{get_extension_from_url(url)}"
+            # Concurrent downloads must never share a path, or their writes interleave
+            filename = unique_filename(filename, used_filenames)
             save_path = os.path.join("documents", filename)
-            future = executor.submit(save_file_with_metadata, url, save_path)
-            future_to_url[future] = url
-            count += 1
-        for future in as_completed(future_to_url):
-            try:
-                if future.result():
-                    successful_downloads += 1
-            except Exception as e:
-                print(f"Error downloading {future_to_url[future]}: {e}")
+            tasks.append(bounded_fetch(url, save_path))
+        results = await asyncio.gather(*tasks, return_exceptions=True)
+    save_metadata(metadata)
+    successful_downloads = 0
+    for result in results:
+        if isinstance(result, Exception):
+            print(f"Error downloading file: {result}")
+        elif result:
+            successful_downloads += 1
     print(f"Successfully downloaded {successful_downloads}/{len(file_links)} files")
     print(f"Total time: {time.time() - start_time:.2f} seconds")
 
@@ -221,13 +538,16 @@ def login_to_website(driver, base_url):
             print("Invalid OTP format. It must be exactly 6 digits.")
             return False
 
-        for i in range(6):
-            otp_field = WebDriverWait(driver, 10).until(
-                EC.presence_of_element_located((By.ID, f"otp2fa_t{i+1}"))
-            )
-            otp_field.clear()
-            otp_field.send_keys(otp[i])
-            time.sleep(0.1)
+        # Fill all six digit fields in one round trip
+        WebDriverWait(driver, 10).until(EC.presence_of_element_located((By.ID, "otp2fa_t1")))
+        driver.execute_script("""
+            const digits = arguments[0];
+            for (let i = 0; i < 6; i++) {
+                const field = document.getElementById('otp2fa_t' + (i + 1));
+                field.value = digits[i];
+                field.dispatchEvent(new Event('input', {bubbles: true}));
+            }
+        """, otp)
 
         # Handle popup if blocking the button
         try:
@@ -251,7 +571,10 @@ def login_to_website(driver, base_url):
         try:
             button = driver.find_element(By.ID, "btnLoginOtp")
             driver.execute_script("arguments[0].scrollIntoView(true);", button)
-            time.sleep(1)
+            # Click as soon as the scroll has brought the button into view
+            WebDriverWait(driver, 5).until(
+                lambda d: d.execute_script("return arguments[0].getBoundingClientRect().top >= 0;", button)
+            )
             driver.execute_script("arguments[0].click();", button)
             print("OTP submitted via JavaScript.")
         except Exception as e:
@@ -267,19 +590,25 @@ def login_to_website(driver, base_url):
 
 
 # ---------- Main Logic ----------
-def scrape_and_download(start_url, max_pages=float('inf'), max_files=float('inf')):
-    extensions = ['.pdf', '.docx', '.doc', '.txt', '.xlsx', '.xls', '.csv', '.ppt', '.pptx']
-    options = webdriver.ChromeOptions()
-    options.add_argument('--headless')
-    options.add_argument('--no-sandbox')
-    options.add_argument('--disable-dev-shm-usage')
-    driver = webdriver.Chrome(options=options)
-    if not login_to_website(driver, start_url):
+def scrape_and_download(start_url, max_pages=float('inf'), max_files=float('inf'), render_js=False,
+                        browser_pool_size=BROWSER_POOL_SIZE):
+    driver = create_driver()
+    try:
+        if not login_to_website(driver, start_url):
+            return
+        # Reuse the browser's authenticated session for plain HTTP fetches and crawl browsers
+        browser_cookies = driver.get_cookies()
+        user_agent = driver.execute_script("return navigator.userAgent;")
+    finally:
         driver.quit()
-        return
-    file_links, pages_scraped = bfs_crawl(start_url, extensions, max_pages, max_files, driver)
-    download_files(file_links, max_files)
-    driver.quit()
+    driver_pool = DriverPool(browser_cookies, start_url, browser_pool_size)
+    try:
+        file_links, pages_scraped = asyncio.run(
+            bfs_crawl(start_url, max_pages, max_files, driver_pool, browser_cookies, user_agent, render_js)
+        )
+    finally:
+        driver_pool.close()
+    asyncio.run(download_files_async(file_links, max_files))
     print(f"\nFinal Stats:\nPages scraped: {pages_scraped}\nFiles found: {len(file_links)}")
 
 def add_or_update_file_manually(file_url):
@@ -288,8 +617,10 @@ def add_or_update_file_manually(file_url):
     if not filename or '.' not in filename:
         filename = f"manual_{int(time.time())}{get_extension_from_url(file_url)}"
     save_path = os.path.join("documents", filename)
-    success = save_file_with_metadata(file_url, save_path)
+    metadata = load_metadata()
+    success = save_file_with_metadata(file_url, save_path, metadata)
     if success:
+        save_metadata(metadata)
         print(f"Manually added or updated: {filename}")
     else:
         print(f"Failed to add or update: {file_url}")